@@ -2,8 +2,11 @@ from flask import Flask, render_template, Response, request, redirect, url_for,
 import os
 import cv2
 import time
+import queue
+import threading
 from werkzeug.utils import secure_filename
-from crowd_counting_rpi import ProfessionalHallwayMonitor, RaspberryPiCameraWrapper
+from crowd_counting_rpi import (ProfessionalHallwayMonitor, RaspberryPiCameraWrapper,
+                                BatchInferenceCoordinator)
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -16,27 +19,51 @@ from datetime import datetime
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # Logging Helper Functions
-LOG_FILE = 'logs.json'
+# One JSON entry per line: saving appends instead of rewriting the whole file
+LOG_FILE = 'logs.jsonl'
+LEGACY_LOG_FILE = 'logs.json'
+
+def migrate_legacy_logs():
+    """Convert an existing logs.json (one JSON list) to logs.jsonl, once"""
+    if os.path.exists(LOG_FILE) or not os.path.exists(LEGACY_LOG_FILE):
+        return
+    try:
+        with open(LEGACY_LOG_FILE, 'r') as f:
+            logs = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not migrate {LEGACY_LOG_FILE}: {e}")
+        return
+    # Write aside and rename, so an interrupted migration is simply retried
+    tmp_file = LOG_FILE + '.tmp'
+    with open(tmp_file, 'w') as f:
+        for entry in logs:
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp_file, LOG_FILE)
+    print(f"✅ Migrated {len(logs)} log entries from {LEGACY_LOG_FILE} to {LOG_FILE}")
 
 def load_logs():
     if not os.path.exists(LOG_FILE):
         return []
-    try:
-        with open(LOG_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
+    logs = []
+    with open(LOG_FILE, 'r') as f:
+        for line in f:
+            try:
+                logs.append(json.loads(line))
+            except ValueError:
+                continue # Skip a partially written line
+    return logs
 
 def save_log(title, out_count):
-    logs = load_logs()
     entry = {
         'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         'title': title,
         'out_count': out_count
     }
-    logs.append(entry)
-    with open(LOG_FILE, 'w') as f:
-        json.dump(logs, f, indent=4)
+    with open(LOG_FILE, 'a') as f:
+        f.write(json.dumps(entry) + "\n")
+
+# At startup, before the first save_log can create logs.jsonl
+migrate_legacy_logs()
 
 
 # Global Constants
@@ -66,39 +93,47 @@ def calculate_zone_from_percentage(percentage, w=None, h=None):
     
     return [[x1, y1], [x2, y2]]
 
+# Shared detector: frames from concurrent streams are batched into one predict call
+detector = ProfessionalHallwayMonitor()
+batcher = BatchInferenceCoordinator(detector)
+
 # Global Monitor Instance
-monitor = ProfessionalHallwayMonitor()
+monitor = ProfessionalHallwayMonitor(coordinator=batcher)
 # Default Zone - Central Rectangle [Top-Left, Bottom-Right]
 # Will be overwritten if using interactive setup or config
 line_points = [[50, 50], [590, 430]] 
 
-# Video Streaming Generator
-def generate_frames(source=0, title=None):
-    global line_points, CAMERA_RESOLUTION, ALERT_THRESHOLD, monitor
-    
-    # Determine which monitor instance to use
-    if source == 0:
-        # LIVE FEED: Use the global persistent monitor
-        current_monitor = monitor
-    else:
-        # UPLOADED VIDEO: Create a FRESH, ISOLATED monitor instance
-        # This ensures stats (In/Out/People) start from ZERO for every new video
-        current_monitor = ProfessionalHallwayMonitor()
+# Lower JPEG quality keeps MJPEG encoding cheap on the Pi
+JPEG_QUALITY = 70
+JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
+# Larger frames (e.g. HD uploads) are downscaled for the browser stream only
+STREAM_MAX_HEIGHT = 480
+
+# Try to use libjpeg-turbo (SIMD/NEON) for MJPEG encoding
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    turbo_jpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo_jpeg = None
+    print("⚠️  PyTurboJPEG not available. Using cv2.imencode for streaming.")
+
+def encode_jpeg(frame):
+    """Encode a processed frame as one multipart MJPEG chunk"""
+    h, w = frame.shape[:2]
+    if h > STREAM_MAX_HEIGHT:
+        frame = cv2.resize(frame, (w * STREAM_MAX_HEIGHT // h, STREAM_MAX_HEIGHT),
+                           interpolation=cv2.INTER_AREA)
     
-    # Use RaspberryPiCameraWrapper if source is 0 (default camera)
-    if source == 0:
-        try:
-            # Try to use Picamera2 first, fallback to OpenCV if not on Pi/not available
-            # Note: We pass use_picamera2=True, the wrapper handles availability check
-            camera = RaspberryPiCameraWrapper(use_picamera2=True, resolution=tuple(CAMERA_RESOLUTION))
-        except Exception as e:
-            print(f"⚠️ Camera init failed: {e}. Falling back to standard OpenCV.")
-            camera = cv2.VideoCapture(source)
+    if turbo_jpeg is not None:
+        jpeg = turbo_jpeg.encode(frame, quality=JPEG_QUALITY, pixel_format=TJPF_BGR)
     else:
-        # File path source
-        camera = cv2.VideoCapture(source)
-    
-    # Initialize resolution from THIS stream (Camera or Upload)
+        ret, buffer = cv2.imencode('.jpg', frame, JPEG_PARAMS)
+        jpeg = buffer.tobytes()
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+
+def stream_line_points(camera):
+    """Zone proportional to this stream's own resolution (Camera or Upload)"""
     current_line_points = line_points # Default fallback
     
     # Determine if we are using the wrapper or standard cv2
@@ -113,25 +148,136 @@ def generate_frames(source=0, title=None):
             # This ensures uploaded videos get a zone proportional to THEIR size
             current_line_points = calculate_zone_from_percentage(CURRENT_PERCENTAGE, width, height)
             print(f"✅ Stream resolution: {width}x{height} - Zone Recalculated")
-            
+    return current_line_points
+
+# Live camera: opened once on first use and shared across requests
+live_camera = None
+live_camera_lock = threading.Lock()
+
+def get_live_camera():
+    global live_camera
+    with live_camera_lock:
+        if live_camera is None:
+            try:
+                # Try to use Picamera2 first, fallback to OpenCV if not on Pi/not available
+                # Note: We pass use_picamera2=True, the wrapper handles availability check
+                live_camera = RaspberryPiCameraWrapper(use_picamera2=True, resolution=tuple(CAMERA_RESOLUTION))
+            except Exception as e:
+                print(f"⚠️ Camera init failed: {e}. Falling back to standard OpenCV.")
+                live_camera = cv2.VideoCapture(0)
+        return live_camera
+
+def release_live_camera():
+    global live_camera
+    with live_camera_lock:
+        if live_camera is not None:
+            live_camera.release()
+            live_camera = None
+
+def offer_latest(client, chunk):
+    """Hand a chunk to a viewer, replacing one it has not picked up yet"""
     try:
-        while True:
-            success, frame = camera.read()
-            if not success:
-                break
-            
-            # Process frame using the SELECTED monitor (Global or Local)
-            # Use local current_line_points instead of global line_points
-            processed_frame = current_monitor.process_frame(frame, current_line_points, alert_threshold=ALERT_THRESHOLD)
-            
-            ret, buffer = cv2.imencode('.jpg', processed_frame)
-            frame = buffer.tobytes()
+        client.get_nowait()
+    except queue.Empty:
+        pass
+    client.put_nowait(chunk)
+
+class LiveStreamBroadcaster:
+    """Run the live pipeline once and fan its MJPEG chunks out to every viewer
+    
+    The pipeline starts with the first viewer and stops when the last one
+    leaves; the camera itself stays open between sessions.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._thread = None
+        self._last_thread = None
+    
+    def frames(self):
+        """Yield MJPEG chunks for one viewer"""
+        client = queue.Queue(maxsize=1)
+        with self._lock:
+            self._clients.add(client)
+            if self._thread is None:
+                # The previous session may still be shutting its pipeline down
+                self._thread = threading.Thread(target=self._broadcast_loop,
+                                                args=(self._last_thread,), daemon=True)
+                self._last_thread = self._thread
+                self._thread.start()
+        try:
+            while True:
+                chunk = client.get()
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            with self._lock:
+                self._clients.discard(client)
+    
+    def _broadcast_loop(self, previous_thread):
+        if previous_thread is not None:
+            previous_thread.join()
+        
+        # LIVE FEED: Use the global persistent monitor
+        camera = get_live_camera()
+        processed_frames = monitor.run_pipeline(camera, stream_line_points(camera),
+                                                alert_threshold=ALERT_THRESHOLD,
+                                                encode=encode_jpeg)
+        try:
+            for chunk in processed_frames:
+                with self._lock:
+                    if not self._clients:
+                        self._thread = None
+                        return
+                    for client in self._clients:
+                        offer_latest(client, chunk)
+        except Exception as e:
+            print(f"⚠️ Live stream stopped: {e}")
+        finally:
+            processed_frames.close()
+        
+        # Camera stopped delivering frames: end every viewer and reopen next time
+        release_live_camera()
+        with self._lock:
+            for client in self._clients:
+                offer_latest(client, None)
+            self._thread = None
+
+live_stream = LiveStreamBroadcaster()
+
+# Video Streaming Generator
+def generate_frames(source=0, title=None):
+    global line_points, CAMERA_RESOLUTION, ALERT_THRESHOLD, monitor
+    
+    if source == 0:
+        # LIVE FEED: every client subscribes to the single shared stream
+        yield from live_stream.frames()
+        return
+    
+    # UPLOADED VIDEO: Create a FRESH, ISOLATED monitor instance
+    # This ensures stats (In/Out/People) start from ZERO for every new video
+    current_monitor = ProfessionalHallwayMonitor(coordinator=batcher)
+    
+    # File path source
+    camera = cv2.VideoCapture(source)
+    current_line_points = stream_line_points(camera)
             
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    # Process frames using the fresh monitor
+    # Uploads must count every frame, so the pipeline never drops frames
+    # JPEG encoding runs on the pipeline's render thread, off the response thread
+    processed_frames = current_monitor.run_pipeline(camera, current_line_points,
+                                                    alert_threshold=ALERT_THRESHOLD,
+                                                    drop_frames=False,
+                                                    encode=encode_jpeg)
+    try:
+        for chunk in processed_frames:
+            yield chunk
     finally:
-        # When stream ends (or is stopped), save log if it was an uploaded video
-        if source != 0 and title:
+        processed_frames.close()
+        
+        # When stream ends (or is stopped), save log for the uploaded video
+        if title:
             print(f"📝 Logging stats for {title}: OUT={current_monitor.out_zone_count}")
             save_log(title, current_monitor.out_zone_count)
             
@@ -7,32 +7,82 @@ from ultralytics import YOLO
 import cv2
 import numpy as np
 import argparse
-from datetime import datetime
+import hashlib
+import os
+import platform
+import queue
+import re
+import shutil
+import signal
+import threading
+import time
 from collections import deque
 
 # Try to import picamera2
 try:
-    from picamera2 import Picamera2
+    from picamera2 import Picamera2, MappedArray
     PICAMERA2_AVAILABLE = True
 except ImportError:
     PICAMERA2_AVAILABLE = False
     print("⚠️  picamera2 not available. Using OpenCV VideoCapture instead.")
 
+# Try to import scipy for optimal track assignment
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# Try to import numba for the JIT-compiled counting kernel
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# torch ships with ultralytics; it is only needed here to size its thread pool
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+# OpenCV's resize/blend/draw kernels are only vectorized on ARM if the build enables NEON
+_OPENCV_BUILD_INFO = cv2.getBuildInformation()
+OPENCV_NEON = 'NEON' in _OPENCV_BUILD_INFO
+OPENCV_GSTREAMER = re.search(r"GStreamer:\s*YES", _OPENCV_BUILD_INFO) is not None
+if platform.machine().startswith(('arm', 'aarch64')) and not OPENCV_NEON:
+    print("⚠️  OpenCV was built without NEON. Image processing will be slower.")
+    print("   Install opencv-python-headless or rebuild with -DENABLE_NEON=ON.")
+
+# Frames in flight (capture queue, inference, render queue, display) plus one
+# being filled; the camera keeps up to this many reusable buffers
+FRAME_RING_SIZE = 8
+
 class RaspberryPiCameraWrapper:
-    """Wrapper to handle both picamera2 and OpenCV capture"""
+    """Wrapper to handle both picamera2 and OpenCV capture
+    
+    Frames are written into preallocated buffers. A buffer handed
+    out by read() is only reused after the caller gives it back with
+    recycle(); when every buffer is still in use a new one is allocated,
+    so a frame is never overwritten while something still reads it.
+    """
     def __init__(self, use_picamera2=True, resolution=(640, 480), framerate=30):
         self.use_picamera2 = use_picamera2 and PICAMERA2_AVAILABLE
         
         if self.use_picamera2:
             print("🎥 Initializing Raspberry Pi Camera (picamera2)...")
             self.picam2 = Picamera2()
+            # libcamera's "RGB888" is laid out [B, G, R] in memory, which is
+            # already OpenCV's native order - no per-frame conversion needed
             config = self.picam2.create_preview_configuration(
                 main={"size": resolution, "format": "RGB888"}
             )
             self.picam2.configure(config)
             self.picam2.start()
             print("✅ Raspberry Pi Camera initialized successfully!")
-            self.width, self.height = resolution
+            # libcamera may align the requested size, use what was configured
+            self.width, self.height = self.picam2.camera_config["main"]["size"]
             self.fps = framerate
         else:
             print("🎥 Initializing camera via OpenCV...")
@@ -47,16 +97,48 @@ class RaspberryPiCameraWrapper:
                     break
             else:
                 raise RuntimeError("❌ Could not open camera!")
+        
+        self._frame_shape = (self.height, self.width, 3)
+        self._free_frames = queue.LifoQueue(maxsize=FRAME_RING_SIZE)
+        for _ in range(FRAME_RING_SIZE):
+            self._free_frames.put_nowait(np.empty(self._frame_shape, dtype=np.uint8))
+    
+    def _take_buffer(self):
+        """A frame buffer nobody holds, allocated if all of them are in use"""
+        try:
+            return self._free_frames.get_nowait()
+        except queue.Empty:
+            return np.empty(self._frame_shape, dtype=np.uint8)
+    
+    def recycle(self, frame):
+        """Give a frame from read() back for reuse once nothing reads it any more"""
+        if frame.shape == self._frame_shape:
+            try:
+                self._free_frames.put_nowait(frame)
+            except queue.Full:
+                pass
     
     def read(self):
         """Read a frame from the camera"""
         if self.use_picamera2:
-            frame = self.picam2.capture_array()
-            # picamera2 returns RGB, OpenCV expects BGR
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            frame = self._take_buffer()
+            # Copy straight out of the camera buffer instead of capture_array(),
+            # which allocates a new array every frame
+            request = self.picam2.capture_request()
+            try:
+                with MappedArray(request, "main") as mapped:
+                    np.copyto(frame, mapped.array[:, :self.width])
+            finally:
+                request.release()
             return True, frame
         else:
-            return self.cap.read()
+            # OpenCV decodes into the given buffer when its shape matches
+            frame = self._take_buffer()
+            ret, decoded = self.cap.read(frame)
+            if decoded is not frame:
+                # Nothing was decoded into it (failed read or another size)
+                self.recycle(frame)
+            return ret, decoded
     
     def isOpened(self):
         """Check if camera is opened"""
@@ -88,15 +170,495 @@ class RaspberryPiCameraWrapper:
             print("🛑 Camera released")
 
 
+def _put_drop_oldest(q, item, on_drop=None):
+    """Put item on a bounded queue, discarding the oldest entry when it is full"""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                dropped = q.get_nowait()
+            except queue.Empty:
+                continue
+            if on_drop is not None:
+                on_drop(dropped)
+
+
+# Export formats Ultralytics can produce and load back through YOLO(), per precision
+# (the first entry is the default when --export is not given)
+EXPORT_FORMATS = {
+    'fp32': ('onnx', 'openvino', 'tflite', 'ncnn'),
+    'fp16': ('openvino', 'tflite', 'ncnn'),
+    'int8': ('tflite', 'openvino'),
+}
+
+# Inference backends selectable with --backend (torch runs the .pt weights as-is)
+BACKENDS = ('torch', 'openvino', 'onnx', 'ncnn')
+
+# Already-exported models accepted by --engine (files or Ultralytics model folders)
+ENGINE_SUFFIXES = ('.onnx', '.engine', '.tflite', '_ncnn_model', '_openvino_model')
+
+# Raspberry Pi V4L2 hardware H.264 encoder, fed through GStreamer
+GSTREAMER_H264_PIPELINE = (
+    "appsrc ! videoconvert ! video/x-raw,format=I420 ! v4l2h264enc ! "
+    "video/x-h264,level=(string)4 ! h264parse ! mp4mux ! filesink location={path}"
+)
+
+def _is_raspberry_pi():
+    try:
+        with open('/proc/device-tree/model') as f:
+            return 'Raspberry Pi' in f.read()
+    except OSError:
+        return False
+
+def open_video_writer(output_path, fps, size):
+    """Open a video writer on the Pi's hardware H.264 encoder, falling back to mp4v"""
+    if OPENCV_GSTREAMER and _is_raspberry_pi():
+        writer = cv2.VideoWriter(GSTREAMER_H264_PIPELINE.format(path=output_path),
+                                 cv2.CAP_GSTREAMER, 0, fps, size)
+        if writer.isOpened():
+            print("🎞️  Recording with hardware H.264 encoder")
+            return writer
+        print("⚠️  Hardware H.264 encoder unavailable. Falling back to mp4v.")
+    return cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+
+
+class AsyncVideoWriter:
+    """cv2.VideoWriter wrapper that encodes frames on a background thread"""
+    def __init__(self, writer, queue_size=8):
+        self.writer = writer
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+    
+    def write(self, frame):
+        """Queue a frame for encoding (blocks only when the queue is full)"""
+        # Copy: camera frames come from a reused buffer ring and are drawn on in place
+        self._queue.put(frame.copy())
+    
+    def _write_loop(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            self.writer.write(frame)
+    
+    def release(self):
+        """Flush queued frames and close the underlying writer"""
+        self._queue.put(None)
+        self._thread.join()
+        self.writer.release()
+
+
+def configure_threads(inference_threads=None, use_torch=True):
+    """Size the torch and OpenCV thread pools from one core budget
+
+    OpenCV's resize/draw/encode kernels get all cores but one (left to
+    capture). Only torch can be pinned (exported models such as OpenVINO,
+    ONNX Runtime, TFLite and ncnn size their own pools), so an explicit
+    inference_threads only shrinks OpenCV's share when torch runs.
+    """
+    cores = os.cpu_count() or 1
+    opencv_threads = max(1, cores - 1)
+    cv2.setUseOptimized(True)
+    if use_torch and TORCH_AVAILABLE:
+        if inference_threads:
+            opencv_threads = max(1, cores - inference_threads)
+        else:
+            inference_threads = max(1, cores - 1)
+        torch.set_num_threads(inference_threads)
+        print(f"🧵 Threads: {inference_threads} inference, {opencv_threads} OpenCV")
+    else:
+        print(f"🧵 OpenCV threads: {opencv_threads}")
+    cv2.setNumThreads(opencv_threads)
+
+
+CALIBRATION_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def _calibration_fingerprint(data):
+    """Short hash of a calibration dataset: its YAML and the images it points at
+
+    Recapturing the images (or editing the YAML) changes the fingerprint,
+    so a cached INT8 export is rebuilt with the new calibration set.
+    """
+    digest = hashlib.sha1(str(data).encode())
+    if os.path.isfile(data):
+        with open(data, 'rb') as f:
+            text = f.read()
+        digest.update(text)
+        root = os.path.dirname(os.path.abspath(data))
+        match = re.search(rb"^path:\s*(.+?)\s*$", text, re.MULTILINE)
+        if match:
+            root = os.path.join(root, match.group(1).decode())
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.lower().endswith(CALIBRATION_IMAGE_EXTENSIONS):
+                    stat = os.stat(os.path.join(dirpath, name))
+                    digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:8]
+
+
+def _cached_model_path(model_path, precision, export_format, imgsz, data=None):
+    """Where the export of model_path for these settings is kept (next to the .pt)
+
+    Ultralytics writes FP32 and FP16 exports to the same place, so each
+    export is moved to a name that carries its precision, input size and
+    (for INT8) calibration set; the format suffix YOLO() uses to pick the
+    backend is kept.
+    """
+    stem = os.path.splitext(model_path)[0]
+    key = f"{stem}_{precision}_{imgsz}"
+    if precision == 'int8' and data:
+        key += f"_calib{_calibration_fingerprint(data)}"
+    if export_format in ('onnx', 'tflite'):
+        return f"{key}.{export_format}"
+    return f"{key}_{export_format}_model"
+
+
+def export_model(model_path="yolo11n.pt", precision="int8", export_format=None,
+                 imgsz=320, data=None):
+    """Export the YOLO weights to a reduced-precision model for fast CPU inference
+
+    The exported file is loaded through the same YOLO() wrapper, so the
+    monitor uses it without any other changes. An export built earlier
+    with the same settings is reused instead of being rebuilt.
+    """
+    formats = EXPORT_FORMATS[precision]
+    export_format = export_format or formats[0]
+    if export_format not in formats:
+        raise ValueError(f"{export_format} export does not support {precision}")
+
+    cached_path = _cached_model_path(model_path, precision, export_format, imgsz, data)
+    if os.path.exists(cached_path):
+        print(f"✅ Using cached {precision.upper()} {export_format} model: {cached_path}")
+        return cached_path
+
+    print(f"📦 Exporting {model_path} to {precision.upper()} {export_format} ({imgsz}px)...")
+    exported_path = YOLO(model_path).export(format=export_format, imgsz=imgsz,
+                                            half=precision == 'fp16',
+                                            int8=precision == 'int8', data=data)
+    shutil.move(str(exported_path), cached_path)
+    print(f"✅ Exported model saved to {cached_path}")
+    return cached_path
+
+
+def capture_calibration_set(camera, output_dir="calib", num_frames=300, every=5):
+    """Save representative camera frames as an INT8 calibration dataset
+
+    Keeps one frame in every `every` so the set covers more of the scene,
+    and writes the dataset YAML expected by export_model(data=...).
+    """
+    image_dir = os.path.join(output_dir, "images")
+    os.makedirs(image_dir, exist_ok=True)
+
+    print(f"📸 Capturing {num_frames} calibration frames into {image_dir}...")
+    saved = 0
+    frame_index = 0
+    while saved < num_frames:
+        ret, frame = camera.read()
+        if not ret:
+            print("⚠️  Camera stopped before the calibration set was complete")
+            break
+        if frame_index % every == 0:
+            cv2.imwrite(os.path.join(image_dir, f"frame_{saved:04d}.jpg"), frame)
+            saved += 1
+        frame_index += 1
+
+    yaml_path = os.path.join(output_dir, "calib.yaml")
+    with open(yaml_path, 'w') as f:
+        f.write(f"path: {os.path.abspath(output_dir)}\n"
+                "train: images\n"
+                "val: images\n"
+                "names:\n"
+                "  0: person\n")
+    print(f"✅ Saved {saved} frames, dataset config: {yaml_path}")
+    return yaml_path
+
+
+def _zone_transitions_numpy(boxes, was_inside, min_x, min_y, max_x, max_y):
+    """Return (inside mask, entered, exited) for boxes against the zone
+
+    was_inside holds the previous state per box: -1 new, 0 outside, 1 inside.
+    Positions use the bottom-center (feet) of each box.
+    """
+    feet_x = ((boxes[:, 0] + boxes[:, 2]) / 2).astype(np.int32)
+    feet_y = boxes[:, 3].astype(np.int32)
+    inside = ((min_x <= feet_x) & (feet_x <= max_x) &
+              (min_y <= feet_y) & (feet_y <= max_y))
+    entered = int(np.count_nonzero((was_inside == 0) & inside))
+    exited = int(np.count_nonzero((was_inside == 1) & ~inside))
+    return inside, entered, exited
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _zone_transitions(boxes, was_inside, min_x, min_y, max_x, max_y):
+        """Compiled single-pass version of _zone_transitions_numpy"""
+        n = boxes.shape[0]
+        inside = np.zeros(n, dtype=np.bool_)
+        entered = 0
+        exited = 0
+        for k in range(n):
+            feet_x = int((boxes[k, 0] + boxes[k, 2]) / 2)
+            feet_y = int(boxes[k, 3])
+            is_inside = min_x <= feet_x <= max_x and min_y <= feet_y <= max_y
+            inside[k] = is_inside
+            if was_inside[k] == 0 and is_inside:
+                entered += 1
+            elif was_inside[k] == 1 and not is_inside:
+                exited += 1
+        return inside, entered, exited
+else:
+    _zone_transitions = _zone_transitions_numpy
+
+
+# The zone-side bookkeeping below is plain array code that numba compiles
+# as written; without numba it runs as NumPy
+_jit = njit(cache=True) if NUMBA_AVAILABLE else (lambda func: func)
+
+
+@_jit
+def _sorted_contains(sorted_ids, ids):
+    """Membership of each of ids in a sorted ID array"""
+    if len(sorted_ids) == 0:
+        return np.zeros(len(ids), dtype=np.bool_)
+    idx = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return sorted_ids[idx] == ids
+
+
+@_jit
+def _zone_state(ids, inside_ids, outside_ids):
+    """Previous side per track: -1 new, 0 outside, 1 inside"""
+    state = np.full(len(ids), -1, dtype=np.int8)
+    state[_sorted_contains(outside_ids, ids)] = 0
+    state[_sorted_contains(inside_ids, ids)] = 1
+    return state
+
+
+@_jit
+def _zone_sides(ids, inside, inside_ids, outside_ids, live_ids):
+    """Sorted (inside, outside) ID arrays after this frame's zone test
+
+    Tracks seen this frame take their new side; unseen ones keep their old
+    side while the tracker still holds them (live_ids, sorted) and are
+    dropped otherwise.
+    """
+    seen = np.sort(ids)
+    keep_in = inside_ids[~_sorted_contains(seen, inside_ids) &
+                         _sorted_contains(live_ids, inside_ids)]
+    keep_out = outside_ids[~_sorted_contains(seen, outside_ids) &
+                           _sorted_contains(live_ids, outside_ids)]
+    return (np.sort(np.concatenate((keep_in, ids[inside]))),
+            np.sort(np.concatenate((keep_out, ids[~inside]))))
+
+
+def _iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two sets of xyxy boxes"""
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+class IoUTracker:
+    """Lightweight tracker that assigns persistent IDs by box overlap
+
+    Each track also keeps a smoothed per-update box velocity; after update()
+    the velocities of the returned boxes are in last_velocities.
+    """
+    def __init__(self, iou_threshold=0.3, max_age=15, velocity_smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.velocity_smoothing = velocity_smoothing
+        self.next_id = 1
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.velocities = np.empty((0, 4), dtype=np.float32)
+        self.ids = np.empty((0,), dtype=int)
+        self.ages = np.empty((0,), dtype=int)
+        self.last_velocities = np.empty((0, 4), dtype=np.float32)
+    
+    def update(self, boxes):
+        """Match detections to existing tracks and return one ID per box"""
+        track_ids = np.zeros(len(boxes), dtype=int)
+        velocities = np.zeros((len(boxes), 4), dtype=np.float32)
+        matched = np.zeros(len(self.ids), dtype=bool)
+        
+        if len(boxes) and len(self.ids):
+            iou = _iou_matrix(boxes, self.boxes)
+            a = self.velocity_smoothing
+            for det, trk in self._assign(iou):
+                track_ids[det] = self.ids[trk]
+                matched[trk] = True
+                # Exponential moving average of the box displacement
+                self.velocities[trk] = (a * self.velocities[trk] +
+                                        (1 - a) * (boxes[det] - self.boxes[trk]))
+                velocities[det] = self.velocities[trk]
+                self.boxes[trk] = boxes[det]
+        self.last_velocities = velocities
+        
+        # Age out tracks that were not seen this frame
+        self.ages = np.where(matched, 0, self.ages + 1)
+        keep = self.ages <= self.max_age
+        self.boxes, self.ids, self.ages = self.boxes[keep], self.ids[keep], self.ages[keep]
+        self.velocities = self.velocities[keep]
+        
+        # Unmatched detections start new tracks
+        new = track_ids == 0
+        if new.any():
+            new_ids = np.arange(self.next_id, self.next_id + new.sum())
+            self.next_id += len(new_ids)
+            track_ids[new] = new_ids
+            self.boxes = np.concatenate([self.boxes, boxes[new]])
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.velocities = np.concatenate([self.velocities,
+                                              np.zeros((len(new_ids), 4), dtype=np.float32)])
+            self.ages = np.concatenate([self.ages, np.zeros(len(new_ids), dtype=int)])
+        
+        return track_ids
+    
+    def _assign(self, iou):
+        """Return (detection, track) index pairs that overlap enough to match"""
+        if SCIPY_AVAILABLE:
+            # Optimal assignment on the IoU matrix
+            dets, trks = linear_sum_assignment(-iou)
+            return [(d, t) for d, t in zip(dets, trks) if iou[d, t] >= self.iou_threshold]
+        
+        # Greedy assignment, highest overlap first
+        pairs = []
+        used_dets, used_trks = set(), set()
+        candidates = np.argwhere(iou >= self.iou_threshold)
+        for d, t in candidates[np.argsort(-iou[candidates[:, 0], candidates[:, 1]])]:
+            if d not in used_dets and t not in used_trks:
+                pairs.append((d, t))
+                used_dets.add(d)
+                used_trks.add(t)
+        return pairs
+
+
+class BatchInferenceCoordinator:
+    """Batch frames from concurrent streams into a single predict call
+
+    Each stream calls detect() from its own thread; a background worker
+    collects the frames that arrive within a short window and runs them
+    through the shared model together. A stream that skips inference on a
+    frame reports it with skip(), so the batch does not wait for it.
+    """
+    def __init__(self, monitor, max_batch=8, window=0.01):
+        self.monitor = monitor
+        self.model = monitor.model
+        self.max_batch = max_batch
+        self.window = window
+        self._cond = threading.Condition()
+        self._pending = []
+        self._streams = set()
+        self._skipping = set()
+        self._next_stream = 0
+        threading.Thread(target=self._worker_loop, daemon=True).start()
+    
+    def open_stream(self):
+        """Register a stream; returns the token it passes to detect() and skip()"""
+        with self._cond:
+            self._next_stream += 1
+            self._streams.add(self._next_stream)
+            return self._next_stream
+    
+    def close_stream(self, stream):
+        with self._cond:
+            self._streams.discard(stream)
+            self._skipping.discard(stream)
+            self._cond.notify()
+    
+    def skip(self, stream):
+        """Leave the current batch: the stream has no frame to detect right now"""
+        with self._cond:
+            if stream in self._streams:
+                self._skipping.add(stream)
+                self._cond.notify()
+    
+    def detect(self, frame, stream=None):
+        """Return the person boxes (N x 4, xyxy) found in a frame"""
+        request = {'frame': frame, 'done': threading.Event(), 'boxes': None, 'error': None}
+        with self._cond:
+            self._skipping.discard(stream)
+            self._pending.append(request)
+            self._cond.notify()
+        request['done'].wait()
+        if request['error'] is not None:
+            raise request['error']
+        return request['boxes']
+    
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Wait only for the streams that are due to submit a frame
+                deadline = time.perf_counter() + self.window
+                while True:
+                    expected = len(self._streams - self._skipping)
+                    if len(self._pending) >= min(self.max_batch, max(1, expected)):
+                        break
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            
+            try:
+                results = self.monitor.process_batch([r['frame'] for r in batch])
+                for request, result in zip(batch, results):
+                    request['boxes'] = result.boxes.xyxy.cpu().numpy()
+            except Exception as e:
+                for request in batch:
+                    request['error'] = e
+            finally:
+                for request in batch:
+                    request['done'].set()
+
+
 class ProfessionalHallwayMonitor:
-    def __init__(self, model_path="yolo11n.pt", confidence=0.5):
-        """Initialize the hallway monitoring system"""
-        self.model = YOLO(model_path)
+    # Dashboard geometry
+    PANEL_HEIGHT = 60
+    CARD_HEIGHT = 40
+    TOP_TEXT_HEIGHT = 28
+    CARD_BG = (60, 60, 60)
+    
+    def __init__(self, model_path="yolo11n.pt", confidence=0.5, coordinator=None,
+                 infer_stride=2, infer_size=320):
+        """Initialize the hallway monitoring system
+        
+        People are detected with predict() and given persistent IDs by a
+        lightweight IoUTracker. With a BatchInferenceCoordinator the model is
+        shared and detections are batched with other streams. Detection
+        runs on every infer_stride-th frame; frames in between reuse the
+        last boxes. Frames are letterboxed to infer_size for inference while
+        boxes come back in native frame coordinates.
+        """
+        self.coordinator = coordinator
+        self._stream = None  # coordinator token while run_pipeline is active
+        # task is given explicitly since exported models carry no task metadata
+        self.model = (coordinator.model if coordinator is not None
+                      else YOLO(model_path, task='detect'))
+        self.tracker = IoUTracker()
         self.confidence = confidence
+        self.infer_stride = max(1, infer_stride)
+        self.infer_size = infer_size
+        # Built once and reused for every predict() call
+        self._predict_kwargs = dict(classes=[0], conf=confidence, imgsz=infer_size,
+                                    verbose=False)
         self.video_writer = None
         
         # Line setup variables
         self.line_points = []
+        self._setup_points = []
         self.setup_complete = False
         
         # Enhanced UI colors (BGR format)
@@ -111,6 +673,11 @@ class ProfessionalHallwayMonitor:
             'accent': (255, 0, 255),        # Magenta
         }
         
+        # Cached dashboard chrome and pre-rendered value digits
+        self._chrome_cache = {}
+        self._overlay_buffers = {}
+        self._glyphs, self._glyph_ascent = self._render_digit_glyphs()
+        
         # Statistics tracking
         self.history_length = 100
         self.occupancy_history = deque(maxlen=self.history_length)
@@ -123,12 +690,20 @@ class ProfessionalHallwayMonitor:
         self.current_zone_occupancy = 0
         self.alerts_count = 0
         self.frame_count = 0
-        self.tracked_objects = {}
+        # Last known side of the zone for every live track, as sorted ID arrays
+        self._inside_ids = np.empty((0,), dtype=int)
+        self._outside_ids = np.empty((0,), dtype=int)
+        self._last_boxes = np.empty((0, 4), dtype=np.float32)
+        self._last_velocities = np.empty((0, 4), dtype=np.float32)
+        self._last_ids = np.empty((0,), dtype=int)
         
-        # FPS calculation
-        self.fps_start_time = datetime.now()
-        self.fps_frame_count = 0
+        # FPS calculation over a sliding window of frame timestamps
+        self._frame_times = deque(maxlen=30)
         self.current_fps = 0
+        
+        # Dashboard clock, re-formatted only when the second changes
+        self._clock_second = None
+        self._clock_text = ""
 
     def reset_stats(self):
         """Reset all tracking statistics"""
@@ -137,7 +712,12 @@ class ProfessionalHallwayMonitor:
         self.current_zone_occupancy = 0
         self.alerts_count = 0
         self.frame_count = 0
-        self.tracked_objects = {}
+        self._inside_ids = np.empty((0,), dtype=int)
+        self._outside_ids = np.empty((0,), dtype=int)
+        self._last_boxes = np.empty((0, 4), dtype=np.float32)
+        self._last_velocities = np.empty((0, 4), dtype=np.float32)
+        self._last_ids = np.empty((0,), dtype=int)
+        self.tracker = IoUTracker()
         self.occupancy_history.clear()
         self.in_history.clear()
         self.out_history.clear()
@@ -145,107 +725,233 @@ class ProfessionalHallwayMonitor:
 
     def process_frame(self, frame, line_points, alert_threshold=10):
         """Process a single frame: Detect, Track, Count, Draw"""
-        h, w = frame.shape[:2]
-        self.frame_count += 1
-        self.fps_frame_count += 1
-        
-        # Calculate FPS
-        if (datetime.now() - self.fps_start_time).total_seconds() >= 1.0:
-            self.current_fps = self.fps_frame_count / (datetime.now() - self.fps_start_time).total_seconds()
-            self.fps_frame_count = 0
-            self.fps_start_time = datetime.now()
-            
-        # Zone Bounds
+        boxes, track_ids = self.track_frame(frame, line_points, alert_threshold)
+        return self.render_frame(frame, line_points, boxes, track_ids, alert_threshold)
+
+    def _zone_bounds(self, line_points):
+        """Return the zone as (min_x, min_y, max_x, max_y) regardless of click order"""
         zone_x1, zone_y1 = line_points[0]
         zone_x2, zone_y2 = line_points[1]
+        return (min(zone_x1, zone_x2), min(zone_y1, zone_y2),
+                max(zone_x1, zone_x2), max(zone_y1, zone_y2))
+
+    def track_frame(self, frame, line_points, alert_threshold=10):
+        """Detect, track and count people in a frame; returns (boxes, track_ids)"""
+        self.frame_count += 1
         
-        # Ensure correct TL/BR order
-        min_x = min(zone_x1, zone_x2)
-        min_y = min(zone_y1, zone_y2)
-        max_x = max(zone_x1, zone_x2)
-        max_y = max(zone_y1, zone_y2)
-        
-        # 1. Draw Zone
-        frame = self.draw_counting_zone(frame, (min_x, min_y), (max_x, max_y), 
-                                      self.in_zone_count, self.out_zone_count)
-        
-        # 2. Run YOLO Track
-        results = self.model.track(frame, persist=True, classes=[0], 
-                                  conf=self.confidence, verbose=False)
-        
-        boxes_list = []
-        ids_list = []
-        
-        # Track current frame's occupancy for this specific frame
-        current_frame_occupants = set()
+        # Calculate FPS
+        now = time.perf_counter()
+        self._frame_times.append(now)
+        elapsed = now - self._frame_times[0]
+        if elapsed > 0:
+            self.current_fps = (len(self._frame_times) - 1) / elapsed
         
-        if results[0].boxes.id is not None:
-            boxes = results[0].boxes.xyxy.cpu().numpy()
-            track_ids = results[0].boxes.id.cpu().numpy().astype(int)
+        # Skipped frames reuse the last tracks, moved along their velocity;
+        # counting only changes on inference frames, where the tracker sees
+        # the accumulated motion
+        phase = (self.frame_count - 1) % self.infer_stride
+        if phase == 0:
+            # Zone Bounds
+            min_x, min_y, max_x, max_y = self._zone_bounds(line_points)
             
-            for box, track_id in zip(boxes, track_ids):
-                boxes_list.append(box)
-                ids_list.append(track_id)
-                
-                x1, y1, x2, y2 = box
-                cx = int((x1 + x2) / 2)
-                cy = int((y1 + y2) / 2) 
-                
-                # Tracking uses bottom-center (feet) for better accuracy in top-down view
-                feet_y = int(y2)
-                feet_x = int(cx)
-                
-                # Check if inside zone
-                is_inside = (min_x <= feet_x <= max_x) and (min_y <= feet_y <= max_y)
-                
-                if is_inside:
-                    current_frame_occupants.add(track_id)
-                
-                # State Logic
-                if track_id not in self.tracked_objects:
-                    # New object
-                    self.tracked_objects[track_id] = is_inside
-                else:
-                    was_inside = self.tracked_objects[track_id]
-                    
-                    if not was_inside and is_inside:
-                        self.in_zone_count += 1 # ENTERED ZONE
-                    elif was_inside and not is_inside:
-                        self.out_zone_count += 1 # EXITED ZONE
-                    
-                    self.tracked_objects[track_id] = is_inside
-        
-        # 3. Draw Detections
-        if boxes_list:
-            frame = self.draw_detections(frame, boxes_list, ids_list) # Keep this or modify to highlight inside?
+            # Run YOLO detection and IoU tracking
+            boxes, track_ids = self._detect_and_track(frame)
+            
+            # State Logic: -1 = new object, 0 = was outside, 1 = was inside
+            was_inside = _zone_state(track_ids, self._inside_ids, self._outside_ids)
+            
+            # Zone test uses bottom-center (feet) for better accuracy in top-down view
+            inside, entered, exited = _zone_transitions(boxes, was_inside,
+                                                        min_x, min_y, max_x, max_y)
+            self.in_zone_count += entered   # ENTERED ZONE
+            self.out_zone_count += exited   # EXITED ZONE
             
-        # 4. Update Statistics
-        self.current_zone_occupancy = len(current_frame_occupants)
+            # Move the seen tracks to their new side and forget the ones the
+            # tracker has dropped, so the arrays never outgrow the live tracks
+            # (tracker IDs are issued in increasing order, so they stay sorted)
+            self._inside_ids, self._outside_ids = _zone_sides(
+                track_ids, inside, self._inside_ids, self._outside_ids, self.tracker.ids)
+            
+            # Track current frame's occupancy (the tracker gives each box its own ID)
+            self.current_zone_occupancy = int(np.count_nonzero(inside))
+            self._last_boxes, self._last_ids = boxes, track_ids
+            # Tracker velocities span one inference step, i.e. infer_stride frames
+            self._last_velocities = self.tracker.last_velocities / self.infer_stride
+        elif self.coordinator is not None:
+            # No detection on this frame: don't hold up the other streams' batch
+            self.coordinator.skip(self._stream)
+        
+        # Update Statistics
         self.occupancy_history.append(self.current_zone_occupancy)
         
         if self.current_zone_occupancy >= alert_threshold:
             self.alerts_count += 1
         
-        # 5. Draw Dashboard
+        if phase and len(self._last_boxes):
+            # Carry the last boxes along their track velocity until the next detection
+            return self._last_boxes + self._last_velocities * phase, self._last_ids
+        return self._last_boxes, self._last_ids
+
+    def _detect_and_track(self, frame):
+        """Return (boxes, track_ids) for the people in a frame"""
+        if self.coordinator is not None:
+            # Shared model: detections are batched with other streams
+            boxes = self.coordinator.detect(frame, self._stream)
+        else:
+            results = self.model.predict(frame, **self._predict_kwargs)
+            boxes = results[0].boxes.xyxy.cpu().numpy()
+        return boxes, self.tracker.update(boxes)
+
+    def process_batch(self, frames):
+        """Run person detection on several frames with a single predict call"""
+        return self.model.predict(list(frames), **self._predict_kwargs)
+
+    def render_frame(self, frame, line_points, boxes, track_ids, alert_threshold=10):
+        """Draw zone, detections, dashboard and alert overlay onto the frame"""
+        h, w = frame.shape[:2]
+        min_x, min_y, max_x, max_y = self._zone_bounds(line_points)
+        
+        # 1. Draw Zone
+        frame = self.draw_counting_zone(frame, (min_x, min_y), (max_x, max_y), 
+                                      self.in_zone_count, self.out_zone_count)
+        
+        # 2. Draw Detections
+        if len(boxes):
+            frame = self.draw_detections(frame, boxes, track_ids)
+        
+        # 3. Draw Dashboard
         frame = self.create_dashboard(frame, self.in_zone_count, self.out_zone_count, 
                                     self.current_zone_occupancy, self.frame_count, 
                                     self.alerts_count, self.current_fps)
         
-        # 6. Draw Alert Overlay
+        # 4. Draw Alert Overlay
         if self.current_zone_occupancy >= alert_threshold:
             cv2.putText(frame, "! OVERCROWDING ALERT !", (w//2 - 150, 100),
                        cv2.FONT_HERSHEY_DUPLEX, 0.8, self.colors['danger'], 2)
                        
         return frame
+
+    def run_pipeline(self, camera, line_points, alert_threshold=10, drop_frames=True,
+                     encode=None, draw_overlays=True):
+        """Yield annotated frames while capture and inference run in worker threads
+
+        Capture feeds the inference thread through a small bounded queue and the
+        caller only renders, so camera I/O overlaps with YOLO. With drop_frames
+        the capture queue holds a single frame and a newer one replaces it, so
+        inference always starts on the freshest frame; pass False for video
+        files so every frame gets counted. If encode is given,
+        rendering and encode(frame) run on a third thread and the generator
+        yields the encoded results instead. With draw_overlays=False nothing is
+        drawn and the raw frames are yielded, for runs nobody watches.
+        
+        Camera buffers are recycled only once the last stage is done with a
+        frame (or it is dropped), so a yielded frame stays valid until the
+        next one is requested.
+        """
+        stop_event = threading.Event()
+        capture_queue = queue.Queue(maxsize=1 if drop_frames else 2)
+        infer_queue = queue.Queue(maxsize=2)
+        output_queue = queue.Queue(maxsize=2) if encode is not None else infer_queue
+        
+        recycle = getattr(camera, 'recycle', None)
+        
+        def release(item):
+            """Hand the camera buffer behind a queue item back to the camera"""
+            frame = item[0] if isinstance(item, tuple) else item
+            if recycle is not None and isinstance(frame, np.ndarray):
+                recycle(frame)
+        
+        def put(q, item):
+            if drop_frames:
+                _put_drop_oldest(q, item, on_drop=release)
+                return
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+        
+        def stage(source, target, work):
+            """Run work() on every item of source until the None sentinel"""
+            try:
+                while not stop_event.is_set():
+                    try:
+                        item = source.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item is None:
+                        break
+                    put(target, work(item))
+            finally:
+                put(target, None)
+        
+        def capture_loop():
+            try:
+                while not stop_event.is_set():
+                    success, frame = camera.read()
+                    if not success:
+                        break
+                    put(capture_queue, frame)
+            finally:
+                put(capture_queue, None)
+        
+        def infer(frame):
+            boxes, track_ids = self.track_frame(frame, line_points, alert_threshold)
+            return frame, boxes, track_ids
+        
+        def render(item):
+            frame, boxes, track_ids = item
+            if not draw_overlays:
+                return frame
+            return self.render_frame(frame, line_points, boxes, track_ids, alert_threshold)
+        
+        def render_and_encode(item):
+            encoded = encode(render(item))
+            release(item)
+            return encoded
+        
+        workers = [threading.Thread(target=capture_loop, daemon=True),
+                   threading.Thread(target=stage, args=(capture_queue, infer_queue, infer),
+                                    daemon=True)]
+        if encode is not None:
+            workers.append(threading.Thread(target=stage, daemon=True,
+                                            args=(infer_queue, output_queue,
+                                                  render_and_encode)))
+        if self.coordinator is not None:
+            self._stream = self.coordinator.open_stream()
+        for worker in workers:
+            worker.start()
+        
+        try:
+            while True:
+                item = output_queue.get()
+                if item is None:
+                    break
+                if encode is not None:
+                    yield item
+                else:
+                    yield render(item)
+                    # The caller has moved on to the next frame
+                    release(item)
+        finally:
+            stop_event.set()
+            for worker in workers:
+                worker.join(timeout=1.0)
+            if self.coordinator is not None:
+                self.coordinator.close_stream(self._stream)
+                self._stream = None
     
     def mouse_callback(self, event, x, y, flags, param):
         """Handle mouse clicks for line setup"""
         if event == cv2.EVENT_LBUTTONDOWN and not self.setup_complete:
             if len(self.line_points) == 0:
                 self.line_points.append([x, y])
+                self._setup_points.append((x, y))
                 print(f"✓ First point set at ({x}, {y})")
             elif len(self.line_points) == 1:
                 self.line_points.append([x, y])
+                self._setup_points.append((x, y))
                 self.setup_complete = True
                 print(f"✓ Second point set at ({x}, {y})")
                 print(f"✓ Counting line configured: {self.line_points}")
@@ -277,12 +983,13 @@ class ProfessionalHallwayMonitor:
                 return None
             
             h, w = frame.shape[:2]
-            display_frame = frame.copy()
+            # Draw straight onto the captured frame; it is only used for this
+            # preview and is never recycled, so no later read can overwrite it
+            display_frame = frame
             
-            # Draw instructions overlay
-            overlay = display_frame.copy()
-            cv2.rectangle(overlay, (0, 0), (w, 60), (40, 40, 40), -1)
-            cv2.addWeighted(overlay, 0.7, display_frame, 0.3, 0, display_frame)
+            # Draw instructions overlay: 70% (40, 40, 40) over the top bar, in place
+            top_bar = display_frame[:61]  # rectangle rows 0..60 inclusive
+            cv2.convertScaleAbs(top_bar, top_bar, alpha=0.3, beta=0.7 * 40)
             
             if not self.setup_complete:
                 if len(self.line_points) == 0:
@@ -298,19 +1005,19 @@ class ProfessionalHallwayMonitor:
                 cv2.putText(display_frame, instruction, (20, 35),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
             
-            # Draw the points and zone
-            if len(self.line_points) >= 1:
-                cv2.circle(display_frame, tuple(self.line_points[0]), 8, (0, 255, 0), -1)
+            # Draw the points and zone (tuples are cached when the points are clicked)
+            points = self._setup_points
+            if len(points) >= 1:
+                cv2.circle(display_frame, points[0], 8, (0, 255, 0), -1)
                 cv2.putText(display_frame, "TL", 
-                           (self.line_points[0][0] + 10, self.line_points[0][1] - 10),
+                           (points[0][0] + 10, points[0][1] - 10),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
             
-            if len(self.line_points) == 2:
-                cv2.rectangle(display_frame, tuple(self.line_points[0]), 
-                             tuple(self.line_points[1]), (0, 255, 0), 2)
-                cv2.circle(display_frame, tuple(self.line_points[1]), 8, (0, 0, 255), -1)
+            if len(points) == 2:
+                cv2.rectangle(display_frame, points[0], points[1], (0, 255, 0), 2)
+                cv2.circle(display_frame, points[1], 8, (0, 0, 255), -1)
                 cv2.putText(display_frame, "BR", 
-                           (self.line_points[1][0] + 10, self.line_points[1][1] - 10),
+                           (points[1][0] + 10, points[1][1] - 10),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
             
             cv2.imshow(window_name, display_frame)
@@ -319,6 +1026,7 @@ class ProfessionalHallwayMonitor:
             
             if key == ord('r') or key == ord('R'):
                 self.line_points = []
+                self._setup_points = []
                 self.setup_complete = False
                 print("↻ Reset - Click two points again")
             elif key == 27:
@@ -333,46 +1041,101 @@ class ProfessionalHallwayMonitor:
     
     def create_dashboard(self, frame, in_count, out_count, current_occupancy, 
                         frame_count, alerts_count, fps=0):
-        """Create professional dashboard overlay (Ultra-Compact Version)"""
+        """Create professional dashboard overlay (Ultra-Compact Version)
+        
+        Only the panel and top text rows differ from the frame, so just those
+        rows are composited instead of blending a full-frame copy.
+        """
         h, w = frame.shape[:2]
-        overlay = frame.copy()
         
-        # Bottom panel (Ultra-Compact)
-        panel_height = 60
-        cv2.rectangle(overlay, (0, h - panel_height), (w, h), self.colors['dark'], -1)
+        # Bottom panel (Ultra-Compact): cached chrome, only the values are drawn
+        panel = self._overlay_buffer('panel', (self.PANEL_HEIGHT, w, 3))
+        np.copyto(panel, self._dashboard_chrome(w, current_occupancy >= 10))
         
-        # Metric cards
         card_width = w // 2 - 15
-        card_height = 40
-        card_y = h - panel_height + 10
-        
-        self._draw_metric_card(overlay, 10, card_y, card_width, card_height,
-                              "OUT", str(out_count), self.colors['info'], "")
+        value_y = 10 + 28  # card top + value baseline
+        self._draw_value(panel, 10 + 10, value_y, str(out_count))
+        self._draw_value(panel, card_width + 20 + 10, value_y, str(current_occupancy))
         
-        color = self.colors['danger'] if current_occupancy >= 10 else self.colors['primary']
-        self._draw_metric_card(overlay, card_width + 20, card_y, card_width, card_height,
-                              "NOW", str(current_occupancy), color, "")
+        frame_panel = frame[h - self.PANEL_HEIGHT:h]
+        cv2.addWeighted(panel, 0.85, frame_panel, 0.15, 0, frame_panel)
         
         # Top Info (Transparent, just text)
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        cv2.putText(overlay, f"RPI MONITOR | FPS: {fps:.1f} | {timestamp}", 
-                   (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.4, self.colors['light'], 1)
+        second = int(time.time())
+        if second != self._clock_second:
+            self._clock_second = second
+            self._clock_text = time.strftime("%H:%M:%S", time.localtime(second))
         
-        cv2.addWeighted(overlay, 0.85, frame, 0.15, 0, frame)
+        # Blending leaves untouched pixels as they are, so only the columns
+        # the text covers need compositing
+        text = f"RPI MONITOR | FPS: {fps:.1f} | {self._clock_text}"
+        (text_width, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)
+        frame_top = frame[:self.TOP_TEXT_HEIGHT, :min(w, 10 + text_width + 4)]
+        top = self._overlay_buffer('top', frame_top.shape)
+        np.copyto(top, frame_top)
+        cv2.putText(top, text, (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.4, self.colors['light'], 1)
+        cv2.addWeighted(top, 0.85, frame_top, 0.15, 0, frame_top)
         return frame
     
-    def _draw_metric_card(self, frame, x, y, width, height, label, value, color, icon):
-        """Draw individual metric card (Ultra-Compact)"""
-        cv2.rectangle(frame, (x, y), (x + width, y + height), (60, 60, 60), -1)
+    def _overlay_buffer(self, name, shape):
+        """Reusable scratch buffer for compositing, reallocated if the size changes"""
+        buf = self._overlay_buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = self._overlay_buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buf
+    
+    def _dashboard_chrome(self, w, alert):
+        """Static bottom panel (background, card frames, labels), cached per width"""
+        key = (w, alert)
+        if key not in self._chrome_cache:
+            chrome = np.empty((self.PANEL_HEIGHT, w, 3), dtype=np.uint8)
+            chrome[:] = self.colors['dark']
+            
+            # Metric cards
+            card_width = w // 2 - 15
+            self._draw_metric_card(chrome, 10, 10, card_width, self.CARD_HEIGHT,
+                                  "OUT", self.colors['info'])
+            color = self.colors['danger'] if alert else self.colors['primary']
+            self._draw_metric_card(chrome, card_width + 20, 10, card_width, self.CARD_HEIGHT,
+                                  "NOW", color)
+            self._chrome_cache[key] = chrome
+        return self._chrome_cache[key]
+    
+    def _draw_metric_card(self, frame, x, y, width, height, label, color):
+        """Draw the static part of a metric card (Ultra-Compact)"""
+        cv2.rectangle(frame, (x, y), (x + width, y + height), self.CARD_BG, -1)
         cv2.rectangle(frame, (x, y), (x + width, y + height), color, 1)
         
-        # Value (Large)
-        cv2.putText(frame, value, (x + 10, y + 28), 
-                   cv2.FONT_HERSHEY_DUPLEX, 0.7, (255, 255, 255), 1)
         # Label (Small, below value)
         cv2.putText(frame, label, (x + 10, y + height - 5),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.35, (200, 200, 200), 1)
     
+    def _render_digit_glyphs(self):
+        """Pre-render 0-9 in the card value font as (glyph, mask, advance)"""
+        glyphs = {}
+        (_, ascent), descent = cv2.getTextSize("0", cv2.FONT_HERSHEY_DUPLEX, 0.7, 1)
+        for digit in "0123456789":
+            (advance, _), _ = cv2.getTextSize(digit, cv2.FONT_HERSHEY_DUPLEX, 0.7, 1)
+            glyph = np.empty((ascent + descent + 2, advance + 4, 3), dtype=np.uint8)
+            glyph[:] = self.CARD_BG
+            cv2.putText(glyph, digit, (0, ascent), 
+                       cv2.FONT_HERSHEY_DUPLEX, 0.7, (255, 255, 255), 1)
+            glyphs[digit] = (glyph, (glyph != self.CARD_BG).any(axis=2), advance)
+        return glyphs, ascent
+    
+    def _draw_value(self, frame, x, baseline_y, text):
+        """Blit pre-rendered digit glyphs instead of calling putText"""
+        top = baseline_y - self._glyph_ascent
+        for digit in text:
+            glyph, mask, advance = self._glyphs[digit]
+            gh, gw = mask.shape
+            gw = min(gw, frame.shape[1] - x)
+            if gw <= 0:
+                break
+            np.copyto(frame[top:top + gh, x:x + gw], glyph[:, :gw],
+                      where=mask[:, :gw, None])
+            x += advance
+    
     def draw_counting_zone(self, frame, tl, br, in_count, out_count):
         """Draw counting zone rectangle"""
         cv2.rectangle(frame, tl, br, self.colors['accent'], 3)
@@ -394,56 +1157,74 @@ class ProfessionalHallwayMonitor:
     
     def draw_detections(self, frame, boxes, track_ids):
         """Draw detection boxes"""
-        for box, track_id in zip(boxes, track_ids):
-            x1, y1, x2, y2 = box
-            cx = int((x1 + x2) / 2)
-            cy = int((y1 + y2) / 2)
+        # Cast to int32 once; centers are then integer math on the same array
+        boxes_i = boxes.astype(np.int32)
+        corners = boxes_i.tolist()
+        centers = ((boxes_i[:, :2] + boxes_i[:, 2:]) >> 1).tolist()
+        
+        for (x1, y1, x2, y2), center, track_id in zip(corners, centers, track_ids.tolist()):
+            center = tuple(center)
             
-            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), 
-                         self.colors['primary'], 3)
-            cv2.circle(frame, (cx, cy), 8, (255, 255, 255), -1)
-            cv2.circle(frame, (cx, cy), 5, self.colors['primary'], -1)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), self.colors['primary'], 3)
+            cv2.circle(frame, center, 8, (255, 255, 255), -1)
+            cv2.circle(frame, center, 5, self.colors['primary'], -1)
             
-            label = f"ID:{track_id}"
-            cv2.rectangle(frame, (int(x1), int(y1) - 15), (int(x1) + 60, int(y1)), 
-                         self.colors['primary'], -1)
-            cv2.putText(frame, label, (int(x1) + 2, int(y1) - 3),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+            # Numeric ID in the box color, no filled label background
+            cv2.putText(frame, str(track_id), (x1 + 2, y1 - 4),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.45, self.colors['primary'], 1)
         
         return frame
     
     def monitor_with_rpi_camera(self, line_points, use_picamera2=True, 
                                 resolution=(640, 480), output_path=None,
-                                show_display=True, alert_threshold=10):
-        """Monitor using Raspberry Pi camera"""
-        camera = RaspberryPiCameraWrapper(use_picamera2, resolution)
+                                show_display=True, alert_threshold=10, camera=None):
+        """Monitor using Raspberry Pi camera
+        
+        Pass an already-open camera (e.g. the one used for zone setup) to skip
+        a second camera start-up; it is released when monitoring ends.
+        """
+        if camera is None:
+            camera = RaspberryPiCameraWrapper(use_picamera2, resolution)
         
         w = int(camera.get(cv2.CAP_PROP_FRAME_WIDTH))
         h = int(camera.get(cv2.CAP_PROP_FRAME_HEIGHT))
         fps_cap = int(camera.get(cv2.CAP_PROP_FPS))
         
         if output_path:
-            self.video_writer = cv2.VideoWriter(
+            self.video_writer = AsyncVideoWriter(open_video_writer(
                 output_path,
-                cv2.VideoWriter_fourcc(*'mp4v'),
                 fps_cap if fps_cap > 0 else 30,
                 (w, h)
-            )
+            ))
         
         print("\n" + "="*60)
         print("🚀 RASPBERRY PI HALLWAY MONITOR ACTIVE")
         print("="*60)
-        print("📹 Press 'Q' to quit")
+        print("📹 Press 'Q' to quit" if show_display else "📹 Press Ctrl+C to quit")
         print("="*60 + "\n")
         
+        # Headless runs have no window to poll for keys, so Ctrl+C ends the loop
+        # instead of waitKey (which would also sleep 1 ms every frame). The
+        # first Ctrl+C hands SIGINT back, so a second one interrupts a stalled read
+        stop_requested = threading.Event()
+        handle_sigint = not show_display and threading.current_thread() is threading.main_thread()
+        if handle_sigint:
+            previous_sigint = signal.getsignal(signal.SIGINT)
+            fallback_sigint = previous_sigint if callable(previous_sigint) else signal.default_int_handler
+            
+            def request_stop(*_):
+                stop_requested.set()
+                signal.signal(signal.SIGINT, fallback_sigint)
+                print("\n🛑 Stopping... press Ctrl+C again to force quit")
+            
+            signal.signal(signal.SIGINT, request_stop)
+        
+        # Headless without recording: only the counts matter, skip all drawing
+        session_start = time.perf_counter()
+        frames = self.run_pipeline(camera, line_points, alert_threshold,
+                                   draw_overlays=show_display or self.video_writer is not None)
         try:
-            while camera.isOpened():
-                success, frame = camera.read()
-                if not success:
-                    break
-                
-                frame = self.process_frame(frame, line_points, alert_threshold)
-                
+            for frame in frames:
                 if self.video_writer:
                     self.video_writer.write(frame)
                 
@@ -452,27 +1233,60 @@ class ProfessionalHallwayMonitor:
                     key = cv2.waitKey(1) & 0xFF
                     if key == ord('q') or key == ord('Q'):
                         break
+                elif stop_requested.is_set():
+                    break
         
         finally:
+            if handle_sigint:
+                signal.signal(signal.SIGINT, previous_sigint)
+            frames.close()
             camera.release()
             if self.video_writer:
                 self.video_writer.release()
-            cv2.destroyAllWindows()
-        
-        print("\n" + "="*60)
-        print("📊 MONITORING SESSION COMPLETE")
-        print("="*60)
-        print(f"✅ Total frames: {frame_count}")
-        print(f"📥 Entered: {in_count}")
-        print(f"📤 Exited: {out_count}")
-        print(f"👥 Final occupancy: {current_occupancy}")
-        print("="*60 + "\n")
+            if show_display:
+                cv2.destroyAllWindows()
+            
+            # Summary is printed even if the loop raised, so the run's numbers survive
+            elapsed = time.perf_counter() - session_start
+            print("\n" + "="*60)
+            print("📊 MONITORING SESSION COMPLETE")
+            print("="*60)
+            print(f"✅ Total frames: {self.frame_count}")
+            print(f"⚡ Average FPS: {self.frame_count / elapsed if elapsed > 0 else 0:.1f}")
+            print(f"📥 Entered: {self.in_zone_count}")
+            print(f"📤 Exited: {self.out_zone_count}")
+            print(f"👥 Final occupancy: {self.current_zone_occupancy}")
+            print("="*60 + "\n")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Raspberry Pi Hallway Monitor")
     parser.add_argument('--model', type=str, default='yolo11n.pt',
                        help='YOLO model path')
+    parser.add_argument('--precision', type=str, default='fp32', choices=EXPORT_FORMATS,
+                       help='Inference precision (fp16/int8 export the model first)')
+    parser.add_argument('--backend', type=str, default=None, choices=BACKENDS,
+                       help='Inference backend (default: torch for fp32, otherwise the '
+                            'first export format of the precision; anything but torch '
+                            'exports the model first)')
+    parser.add_argument('--threads', type=int, default=None,
+                       help='torch inference threads; OpenCV gets the remaining cores '
+                            '(default: one less than the CPU cores for both; exported '
+                            'backends pick their own)')
+    parser.add_argument('--export', type=str, default=None,
+                       choices=sorted({f for fmts in EXPORT_FORMATS.values() for f in fmts}),
+                       help='Export format for the selected precision')
+    parser.add_argument('--calib-data', type=str, default=None,
+                       help='Dataset YAML used for INT8 calibration')
+    parser.add_argument('--capture-calib', type=int, default=None, metavar='N',
+                       help='Capture N camera frames as an INT8 calibration set and exit')
+    parser.add_argument('--engine', type=str, default=None,
+                       help='Already-exported model to run (.onnx, .engine, .tflite, '
+                            '*_ncnn_model, *_openvino_model)')
+    parser.add_argument('--infer-stride', type=int, default=2,
+                       help='Run detection every N frames (1 = every frame)')
+    parser.add_argument('--imgsz', type=int, default=320,
+                       help='Inference input size (boxes come back in frame coordinates)')
     parser.add_argument('--output', type=str, default=None,
                        help='Output video path')
     parser.add_argument('--threshold', type=int, default=10,
@@ -489,21 +1303,66 @@ def main():
                        help='Use OpenCV instead of picamera2')
     parser.add_argument('--no-display', action='store_true',
                        help='Headless mode')
+    parser.add_argument('--verbose', action='store_true',
+                       help='Print the OpenCV build information (e.g. to check NEON)')
     
     args = parser.parse_args()
     
-    monitor = ProfessionalHallwayMonitor(model_path=args.model, confidence=0.5)
+    if args.verbose:
+        print(_OPENCV_BUILD_INFO)
+    
+    if args.capture_calib:
+        camera = RaspberryPiCameraWrapper(
+            use_picamera2=not args.use_opencv,
+            resolution=tuple(args.resolution)
+        )
+        try:
+            capture_calibration_set(camera, num_frames=args.capture_calib)
+        finally:
+            camera.release()
+        return
+    
+    if args.threads is not None and args.threads < 1:
+        parser.error("--threads must be at least 1")
+    if args.backend == 'torch' and (args.precision != 'fp32' or args.export):
+        parser.error("--backend torch only runs the FP32 .pt weights; "
+                     "pick another backend for --precision/--export")
+    
+    model_path = args.model
+    export_format = args.export or (args.backend if args.backend != 'torch' else None)
+    if args.engine:
+        if not args.engine.rstrip('/').endswith(ENGINE_SUFFIXES):
+            parser.error(f"--engine expects one of: {', '.join(ENGINE_SUFFIXES)}")
+        model_path = args.engine
+    elif args.precision != 'fp32' or export_format:
+        if export_format and export_format not in EXPORT_FORMATS[args.precision]:
+            parser.error(f"{export_format} does not support {args.precision}")
+        model_path = export_model(model_path, args.precision, export_format,
+                                  imgsz=args.imgsz, data=args.calib_data)
     
-    # Initialize camera for line setup if needed
+    use_torch = model_path.endswith('.pt')
+    if args.threads and not use_torch:
+        print("⚠️  --threads only applies to the torch backend; ignoring it.")
+    configure_threads(args.threads, use_torch=use_torch)
+    if args.verbose:
+        print(f"NEON: {'YES' if OPENCV_NEON else 'NO'} | "
+              f"OpenCV threads: {cv2.getNumThreads()} | Optimized: {cv2.useOptimized()}")
+    
+    monitor = ProfessionalHallwayMonitor(model_path=model_path, confidence=0.5,
+                                         infer_stride=args.infer_stride,
+                                         infer_size=args.imgsz)
+    
+    # Initialize camera for line setup if needed; it stays open for monitoring
+    camera = None
     if args.interactive:
         camera = RaspberryPiCameraWrapper(
             use_picamera2=not args.use_opencv,
             resolution=tuple(args.resolution)
         )
-        line_points = monitor.setup_counting_zone(camera)
-        camera.release()
+        line_points = monitor.setup_counting_line(camera)
         
         if line_points is None:
+            camera.release()
             print("Setup cancelled. Exiting...")
             return
     elif args.line_start and args.line_end:
@@ -519,7 +1378,8 @@ def main():
         resolution=tuple(args.resolution),
         output_path=args.output,
         show_display=not args.no_display,
-        alert_threshold=args.threshold
+        alert_threshold=args.threshold,
+        camera=camera
     )
 
 
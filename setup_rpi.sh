@@ -25,6 +25,10 @@ pip3 install --upgrade pip
 pip3 install -r requirements.txt
 pip3 install openvino
 
+# libjpeg-turbo for faster MJPEG streaming (optional, OpenCV is used otherwise)
+sudo apt install -y libturbojpeg0
+pip3 install PyTurboJPEG
+
 
 # Service Installation
 echo "⚙️ Installing Systemd Service..."